@@ -6,6 +6,7 @@
 #- $ python3 --version                                        /// Check Python Version
 #- $ pip3 install myloginpath                                 /// myloginpath (for reading MySQL login-path credentials)
 #- $ pip3 install PyMySQL                                     /// PyMySQL - pure Python MySQL driver, no gcc / C headers required
+#- mysql_connection_core.py (repo: mysql_common/)             /// Shared login-path / connection pool core - copy next to this script
 
 
 # Description:
@@ -15,20 +16,23 @@
 #- Shows how close is the column to its maximum allowed value to avoid unexpected downtime due to column overflow.
 
 
+import os
 import sys
-import myloginpath
-import pymysql
 import time
 import concurrent.futures
 import threading
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mysql_common"))
+import mysql_connection_core as core  # noqa: E402
+
 # Configurable Variables: 
 LOGIN_PATH='local'
 DATABASE_TO_CHECK='sportsbook_updated'      # Set database to check
 TABLE_TO_CHECK=''                           # Set optional table for check (leave empty '' if checking whole DB)
 WARNING_THRESHOLD=70.0                      # Warn if column is more than 70% full
 NUMBER_OF_THREADS=5                         # Set number of threads for column checking (Number of MySQL connections)
+QUERY_TIMEOUT=0                             # Per-column MAX() query timeout in seconds (0 = no limit)
 
 # Log File Names:
 FULL_LOG_FILE = "mysql_max_int_value_full.log"
@@ -55,17 +59,21 @@ def connect_and_fetch_columns():
     
     global TOTAL_COLUMNS_EXTRACTED
 
-    # Parse the MySQL mysql_config_editor --login-path
+    # Parse the MySQL mysql_config_editor --login-path (cached - the worker threads reuse it)
     try:
-        conf = myloginpath.parse((LOGIN_PATH))   # Login-path=local
+        core.parse_login_path(LOGIN_PATH)   # Login-path=local
 
     except Exception as e:
         log_message(f"Error reading login path: {e}")
         sys.exit(1)
 
+    # One pooled connection per worker thread - reused across columns instead of a new connection per column:
+    # autocommit=True - a pooled connection must not hold one read view (stale snapshot, blocked purge) for the whole scan:
+    pool = core.ConnectionPool(LOGIN_PATH, size=NUMBER_OF_THREADS, database=DATABASE_TO_CHECK, autocommit=True)
+
     # Connect to database:
     try:
-        connection = pymysql.connect(**conf, database=(DATABASE_TO_CHECK))
+        connection = pool.acquire()
         log_message("Connected successfully to MySQL")
     except Exception as e:
         log_message(f"Error connecting to MySQL: {e}")
@@ -94,56 +102,57 @@ def connect_and_fetch_columns():
     # Execute query and store results: 
     try:
         cursor = connection.cursor()
-        cursor.execute(CHECK_COLUMNS_QUERY)
+        core.execute(cursor, CHECK_COLUMNS_QUERY)
         results = cursor.fetchall()
+        cursor.close()
+        pool.release(connection)
         TOTAL_COLUMNS_EXTRACTED = len(results)
         log_message(f"Total integer columns extracted: {TOTAL_COLUMNS_EXTRACTED}")
-        return results, connection, conf
+        return results, pool
     except Exception as e:
         log_message(f"Error during fetching columns: {e}")
         sys.exit(1)
 
 
 # ===== Fucntion to muntithread column MAX VALUE Scan: =====
-def check_column_max(args_conf):
+def check_column_max(args_pool):
     global COLUMNS_CHECKED
-    args, conf = args_conf
+    args, pool = args_pool
     table_name, column_name, column_type, max_value = args
 
     try:
-        # Connect to the DB with a new thread (conn.cursor):
-        conn = pymysql.connect(**conf, database=DATABASE_TO_CHECK)
-        cursor = conn.cursor()
-
-        # Using backticks for all identifiers to prevent SQL errors on reserved words:
-        MAX_VALUE_QUERY = f"SELECT MAX(`{column_name}`), ROUND((MAX(`{column_name}`)/{max_value})*100, 2) FROM `{DATABASE_TO_CHECK}`.`{table_name}`;"
-
-        # Execute this block with multiple threads defined in main execution logic, and measure execution time for each column: 
-        start_time = time.time()
-        cursor.execute(MAX_VALUE_QUERY)
-        current_value, ratio = cursor.fetchone()
-        elapsed = time.time() - start_time
-
-        # Check if ratio is above the warning threshold and log accordingly with thread lock to prevent mixed console output:
-        with lock:
-            COLUMNS_CHECKED += 1
-            # Pre-calculating padding for clean progress display:
-            padding = len(str(TOTAL_COLUMNS_EXTRACTED))
-            progress = f"[{COLUMNS_CHECKED:>{padding}}/{TOTAL_COLUMNS_EXTRACTED}]"
+        # Borrow a pooled connection for this thread (returned to the pool, or dropped if it broke):
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+
+            # Using backticks for all identifiers to prevent SQL errors on reserved words:
+            MAX_VALUE_QUERY = f"SELECT MAX(`{column_name}`), ROUND((MAX(`{column_name}`)/{max_value})*100, 2) FROM `{DATABASE_TO_CHECK}`.`{table_name}`;"
+
+            # Execute this block with multiple threads defined in main execution logic, and measure execution time for each column: 
+            start_time = time.time()
+            core.execute(cursor, MAX_VALUE_QUERY, timeout=QUERY_TIMEOUT)
+            current_value, ratio = cursor.fetchone()
+            elapsed = time.time() - start_time
+
+            # Check if ratio is above the warning threshold and log accordingly with thread lock to prevent mixed console output:
+            with lock:
+                COLUMNS_CHECKED += 1
+                # Pre-calculating padding for clean progress display:
+                padding = len(str(TOTAL_COLUMNS_EXTRACTED))
+                progress = f"[{COLUMNS_CHECKED:>{padding}}/{TOTAL_COLUMNS_EXTRACTED}]"
             
-            # If table is empty, ratio is None:
-            if ratio is not None and ratio >= WARNING_THRESHOLD:
-                msg = (f"{progress} 🚩 WARNING: '{table_name}'.'{column_name}' is {ratio}% full!\n"
-                       f"    Type: {column_type} | Max: {max_value} | Current: {current_value} | Time: {elapsed:.2f}s")
+                # If table is empty, ratio is None:
+                if ratio is not None and ratio >= WARNING_THRESHOLD:
+                    msg = (f"{progress} 🚩 WARNING: '{table_name}'.'{column_name}' is {ratio}% full!\n"
+                           f"    Type: {column_type} | Max: {max_value} | Current: {current_value} | Time: {elapsed:.2f}s")
                 
-                # Store data for the table report:
-                WARNINGS_FOUND.append([table_name, column_name, column_type, max_value, current_value, ratio])
-            else:
-                msg = f"{progress} Checked '{table_name}'.'{column_name}'... OK ({elapsed:.2f}s)"
+                    # Store data for the table report:
+                    WARNINGS_FOUND.append([table_name, column_name, column_type, max_value, current_value, ratio])
+                else:
+                    msg = f"{progress} Checked '{table_name}'.'{column_name}'... OK ({elapsed:.2f}s)"
             
-        # Write to console and full log
-        log_message(msg)
-        conn.close()
+            # Write to console and full log
+            log_message(msg)
 
     # Handle errors: 
     except Exception as e:
@@ -152,17 +161,17 @@ def check_column_max(args_conf):
 # ==================== MAIN EXECUTION =================== #
 
 # Initialize to avoid UnboundLocalError in finally block
-connection = None
+pool = None
 
 try:
-    results, connection, conf = connect_and_fetch_columns()
+    results, pool = connect_and_fetch_columns()
     
     # Initialize the log file with a header
     with open(FULL_LOG_FILE, "a") as f:
         f.write(f"\n--- Starting Scan: {datetime.now()} ---\n")
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=NUMBER_OF_THREADS) as executor:
-        executor.map(check_column_max, [(r, conf) for r in results])
+        executor.map(check_column_max, [(r, pool) for r in results])
 
 except Exception as e:
     log_message(f"Error during processing: {e}")
@@ -202,5 +211,5 @@ finally:
         with open(FULL_LOG_FILE, "a") as f:
             f.write(f"\n=== No columns exceeded the warning threshold ({WARNING_THRESHOLD}%). All systems nominal. ===\n")
 
-    if connection:
-        connection.close()
\ No newline at end of file
+    if pool:
+        pool.close()
\ No newline at end of file
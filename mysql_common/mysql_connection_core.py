@@ -0,0 +1,192 @@
+# Requirements:
+# -------------------
+#- $ python3 --version                  /// Check Python Version
+#- $ pip3 install myloginpath           /// myloginpath (for reading MySQL login-path credentials)
+#- $ pip3 install PyMySQL               /// PyMySQL - pure Python MySQL driver, no gcc / C headers required
+
+
+# Description:
+# -------------------
+#- Shared connection / credential core for the Python MySQL tools in this repo:
+#-   - mysql_check_max_int_value.py, mysql_check_replication_lag.py, mysql_processlist_exporter.py
+#- Not a script on its own - each tool imports it. Provides:
+#-   - parse_login_path()  - cached myloginpath.parse (the .mylogin.cnf is decrypted once per process, not per connect)
+#-   - connect()           - PyMySQL connect from a login-path with connect/read timeouts and retry + exponential backoff
+#-   - ConnectionPool      - thread-safe bounded pool; idle connections are health-checked (ping) before reuse
+#-   - execute()           - cursor.execute with an optional per-statement timeout (MAX_EXECUTION_TIME hint on SELECTs)
+#-                           and query timing hooks (add_query_hook) for instrumentation
+
+
+# Deployment:
+# -------------------
+#- Copy this file next to the tool that uses it (e.g. /opt/mysql_replication_lag_investigation_script/), or keep the
+#- repo layout - each tool also looks for it in ../mysql_common/.
+
+
+import re
+import time
+import threading
+import functools
+import collections
+import contextlib
+import myloginpath
+import pymysql
+
+# ==================== Configurable Defaults ==================== #
+CONNECT_TIMEOUT_SECONDS = 10                # TCP / socket connect timeout
+READ_TIMEOUT_SECONDS = None                 # Client-side cap on waiting for any single result (None = no cap; tools set their own)
+CONNECT_RETRIES = 2                         # Retries on top of the first connect attempt
+BACKOFF_BASE_SECONDS = 1                    # First retry waits this long, doubling every attempt...
+BACKOFF_CAP_SECONDS = 30                    # ...up to this
+POOL_ACQUIRE_TIMEOUT_SECONDS = 30           # How long a caller waits for a free pool slot
+POOL_HEALTH_CHECK_SECONDS = 30              # Ping idle connections older than this before handing them out
+
+QUERY_HOOKS = []                            # Callables hook(sql, seconds, error) run after every execute()
+
+
+class PoolTimeout(Exception):
+    """No pool slot became free within the acquire timeout."""
+
+
+# ==================== Credentials ==================== #
+@functools.lru_cache(maxsize=None)
+def _parse_login_path(login_path):
+    return tuple(sorted(myloginpath.parse(login_path).items()))
+
+
+def parse_login_path(login_path):
+    """myloginpath.parse, cached per login-path. Returns a fresh dict each call so callers can't poison the cache."""
+    return dict(_parse_login_path(login_path))
+
+
+# ==================== Connections ==================== #
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_CAP_SECONDS):
+    """Exponential backoff: base, 2*base, 4*base, ... capped at cap. attempt starts at 0."""
+    return min(cap, base * (2 ** attempt))
+
+
+def connect(login_path, retries=CONNECT_RETRIES, **kwargs):
+    """Opens a PyMySQL connection from a login-path, retrying with exponential backoff.
+    Extra kwargs go straight to pymysql.connect (database, cursorclass, autocommit, ...)."""
+    kwargs.setdefault("connect_timeout", CONNECT_TIMEOUT_SECONDS)
+    kwargs.setdefault("read_timeout", READ_TIMEOUT_SECONDS)
+    conf = parse_login_path(login_path)
+
+    for attempt in range(retries + 1):
+        try:
+            return pymysql.connect(**conf, **kwargs)
+        except pymysql.err.OperationalError:
+            if attempt == retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+
+
+class ConnectionPool(object):
+    """Thread-safe bounded pool of PyMySQL connections for one login-path.
+
+        pool = ConnectionPool('local', size=5, database='mydb')
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            execute(cursor, "SELECT ...", timeout=5)
+
+    At most 'size' connections exist at once. A connection that raised a connection-level error is closed
+    instead of being returned to the pool."""
+
+    def __init__(self, login_path, size=5, acquire_timeout=POOL_ACQUIRE_TIMEOUT_SECONDS,
+                 health_check_seconds=POOL_HEALTH_CHECK_SECONDS, **connect_kwargs):
+        self.login_path = login_path
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_seconds = health_check_seconds
+        self.connect_kwargs = connect_kwargs
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = collections.deque()   # (connection, monotonic time it was returned)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeout(f"No free connection in pool '{self.login_path}' (size={self.size}) after {self.acquire_timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, returned_at = self._idle.pop()  # most recently used first - most likely still alive
+                if time.monotonic() - returned_at < self.health_check_seconds:
+                    return conn
+                try:
+                    conn.ping(reconnect=False)
+                    return conn
+                except Exception:
+                    _close_quietly(conn)
+            return connect(self.login_path, **self.connect_kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        if discard:
+            _close_quietly(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                _close_quietly(self._idle.pop()[0])
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+# ==================== Statements ==================== #
+_LEADING_SELECT = re.compile(r"^(\s*)SELECT\b", re.IGNORECASE)
+
+
+def with_statement_timeout(sql, timeout):
+    """Adds a MAX_EXECUTION_TIME optimizer hint to a SELECT so the server aborts it after 'timeout' seconds.
+    Other statements (SHOW, SET, DML) are returned unchanged - MySQL only honours the hint on SELECT."""
+    if not timeout:
+        return sql
+    return _LEADING_SELECT.sub(lambda m: f"{m.group(1)}SELECT /*+ MAX_EXECUTION_TIME({int(timeout * 1000)}) */", sql, count=1)
+
+
+def add_query_hook(hook):
+    """Registers hook(sql, seconds, error) to be called after every execute() - error is None on success."""
+    QUERY_HOOKS.append(hook)
+
+
+def execute(cursor, sql, params=None, timeout=None):
+    """cursor.execute with an optional per-statement timeout, timed and reported to QUERY_HOOKS."""
+    started = time.perf_counter()
+    error = None
+    try:
+        return cursor.execute(with_statement_timeout(sql, timeout), params)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        for hook in QUERY_HOOKS:
+            try:
+                hook(sql, elapsed, error)
+            except Exception:
+                pass
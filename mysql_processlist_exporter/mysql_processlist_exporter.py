@@ -11,8 +11,8 @@
 # -------------------
 #- $ python3 --version                                        /// Check Python Version 
 #- $ pip3 install myloginpath                                 /// myloginpath (for reading MySQL login-path credentials)
-#- $ dnf install python3-devel mariadb-connector-c-devel gcc  /// mysqlclient (MySQLdb) library and 'C' compiler    
-#- $ pip3 install mysqlclient                                 /// mysqlclient (MySQLdb)     
+#- $ pip3 install PyMySQL                                     /// PyMySQL - pure Python MySQL driver, no gcc / C headers required
+#- mysql_connection_core.py (repo: mysql_common/)             /// Shared login-path / connection pool core - copy next to this script
 #- $ pip3 install prometheus-client                           /// prometheus_client Module
 #- $ /etc/systemd/system/mysql_processlist_exporter.service   /// Create systemd service file as needed
 
@@ -23,25 +23,34 @@
 #- Exposes one metric: mysql_processlist_exporter_metrics
 #- Labels: process_id, user, host, db, state, info (truncated), hostname
 #- Uses a custom collector (GaugeMetricFamily) so metrics are rebuilt on every scrape (no manual clearing)
+#- Reuses pooled, health-checked connections across scrapes (login-path parsed once) instead of connecting per scrape
+#- Exposes its own scrape query duration as mysql_processlist_exporter_scrape_duration_seconds
 #- Configurable filters at the top of the file 
 
 
+import os
 import time
 import socket
-import myloginpath
-import MySQLdb
 import logging
 import signal
 import sys
+import pymysql
+import pymysql.cursors
 from prometheus_client import start_http_server, REGISTRY
 from prometheus_client.core import GaugeMetricFamily
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mysql_common"))
+import mysql_connection_core as core  # noqa: E402
+
 
 #______________________________________________________________________________________________________________
 # Exporter Configuration Variables: 
 EXPORTER_PORT = 9105                     # Custom exporter port.
 LOGIN_PATH = 'local'                     # DB login-path. 
 HOSTNAME = socket.gethostname()          # Fetch the hostname from the host and export it as label
+POOL_SIZE = 2                            # Max MySQL connections kept open (overlapping scrapes share these)
+QUERY_TIMEOUT = 5                        # Secs - server-side limit on the processlist query (keep below scrape_timeout)
+CONNECT_TIMEOUT = 3                      # Secs - single connect attempt per scrape, no retries (keep below scrape_timeout)
 
 
 # Processlist Scraping Filters: 
@@ -56,6 +65,8 @@ INFO_MAX_LEN = 30                       # Number of CHARS for INFO
 # Metric Name & Labels:
 METRIC_NAME = "mysql_processlist_exporter_metrics"
 METRIC_DESC = "Runtime (seconds) of MySQL processlist entries (truncated info)"
+SCRAPE_METRIC_NAME = "mysql_processlist_exporter_scrape_duration_seconds"
+SCRAPE_METRIC_DESC = "Time spent running the processlist query for this scrape"
 
 #______________________________________________________________________________________________________________
 
@@ -67,6 +78,10 @@ class ProcesslistCollector(object):
     # ====== If no argument is passed to login_path if uses sys variable "LOGIN_PATH": ====== #  
     def __init__(self, login_path=LOGIN_PATH):
         self.login_path = login_path
+        self.pool = core.ConnectionPool(login_path, size=POOL_SIZE, database="information_schema",
+                                        cursorclass=pymysql.cursors.DictCursor, autocommit=True,
+                                        read_timeout=QUERY_TIMEOUT * 2, connect_timeout=CONNECT_TIMEOUT,
+                                        retries=0)  # MySQL down = fail this scrape fast; Prometheus retries next interval
 
     # ====== Every time Prometheus scrapes the endpoint this function is exected: ====== # 
     # ====== Scrape interval is managed in Prometheus yaml config, not in the exporter! ====== # 
@@ -82,78 +97,74 @@ class ProcesslistCollector(object):
         )
 
         try:
-            conf = myloginpath.parse(self.login_path)
+            core.parse_login_path(self.login_path)   # Cached after the first scrape
         except Exception as e:
             logging.error("Error Parsing Login Path '%s': %s", self.login_path, e)
             logging.info("MySQL Processlist Exporter Shutting Down...")
             sys.exit(0)
 
-        conn = None
-        cursor = None
+        scrape_duration = 0.0
         try:
-            conn = MySQLdb.connect(**conf, db="information_schema")
-            cursor = conn.cursor(MySQLdb.cursors.DictCursor)
-
-            sql = """
-                SELECT ID, USER, HOST, DB, STATE, TIME, INFO
-                FROM performance_schema.processlist
-                WHERE TIME > %s
-                AND DB = %s
-                AND USER REGEXP %s
-                AND STATE REGEXP %s
-                AND INFO REGEXP %s;
-                """
-
-            cursor.execute(
-                    sql,
-                    (
-                        EXECUTION_TIME_WARNING_THRESHOLD,
-                        DATABASE_FILTER,
-                        USER_FILTER,
-                        PROCESS_STATE_FILTER,
-                        INFO_TEXT_FILTER,
-                    ),
-                )
-
-            # Fetch Columns Metrics: 
-            rows = cursor.fetchall()
-
-            for row in rows:
-                # Normalize and truncate fields: 
-                id = str(row.get("ID") or "unknown")
-                user = (row.get("USER") or "unknown")
-                host = (row.get("HOST") or "unknown")
-                db = (row.get("DB") or "unknown")
-                state = (row.get("STATE") or "unknown")
-                info_text = row.get("INFO") or "unknown"
-                if len(info_text) > INFO_MAX_LEN:
-                    info_text = info_text[:INFO_MAX_LEN] + "..."
-
-                runtime = float(row.get("TIME") or 0.0)
-
-                metric.add_metric(
-                    [id, user, host, db, state, info_text, HOSTNAME],
-                    runtime,
-                )
-                logging.info(
-                    "Metrics Scraped: process_id=%s user=%s db=%s state=%s runtime=%s", 
-                    id, user, db, state, runtime
-                )
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+
+                sql = """
+                    SELECT ID, USER, HOST, DB, STATE, TIME, INFO
+                    FROM performance_schema.processlist
+                    WHERE TIME > %s
+                    AND DB = %s
+                    AND USER REGEXP %s
+                    AND STATE REGEXP %s
+                    AND INFO REGEXP %s;
+                    """
+
+                start_time = time.perf_counter()
+                core.execute(
+                        cursor,
+                        sql,
+                        (
+                            EXECUTION_TIME_WARNING_THRESHOLD,
+                            DATABASE_FILTER,
+                            USER_FILTER,
+                            PROCESS_STATE_FILTER,
+                            INFO_TEXT_FILTER,
+                        ),
+                        timeout=QUERY_TIMEOUT,
+                    )
+
+                # Fetch Columns Metrics: 
+                rows = cursor.fetchall()
+                cursor.close()
+                scrape_duration = time.perf_counter() - start_time
+
+                for row in rows:
+                    # Normalize and truncate fields: 
+                    id = str(row.get("ID") or "unknown")
+                    user = (row.get("USER") or "unknown")
+                    host = (row.get("HOST") or "unknown")
+                    db = (row.get("DB") or "unknown")
+                    state = (row.get("STATE") or "unknown")
+                    info_text = row.get("INFO") or "unknown"
+                    if len(info_text) > INFO_MAX_LEN:
+                        info_text = info_text[:INFO_MAX_LEN] + "..."
+
+                    runtime = float(row.get("TIME") or 0.0)
+
+                    metric.add_metric(
+                        [id, user, host, db, state, info_text, HOSTNAME],
+                        runtime,
+                    )
+                    logging.info(
+                        "Metrics Scraped: process_id=%s user=%s db=%s state=%s runtime=%s", 
+                        id, user, db, state, runtime
+                    )
                 
         except Exception as e:
             logging.error("Collecting Processlist Failed: %s", e)
 
-        finally:
-            try:
-                if cursor:
-                    cursor.close()
-                if conn:
-                    conn.close()
-            except Exception:
-                pass
-
         # Yield the metric (possibly empty)
         yield metric
+        yield GaugeMetricFamily(SCRAPE_METRIC_NAME, SCRAPE_METRIC_DESC, value=scrape_duration)
 
 
 # ==== Function for Journalctl Shutdown Message: ==== # 
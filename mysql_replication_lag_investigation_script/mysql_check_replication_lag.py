@@ -6,7 +6,9 @@
 #- $ python3 --version                  /// Check Python Version
 #- $ pip3 install myloginpath           /// myloginpath (for reading MySQL login-path credentials)
 #- $ pip3 install PyMySQL               /// PyMySQL - pure Python MySQL driver, no gcc / C headers required
+#- mysql_connection_core.py (repo: mysql_common/) next to this script - shared login-path / connection / timing core
 #- The 'mysql' CLI client must be on PATH - used via subprocess to dump raw, unformatted evidence output during a LAGGING episode
+#- $ pip3 install prometheus-client     /// OPTIONAL - only needed when METRICS_PORT is set (built-in /metrics endpoint)
 
 
 # Description:
@@ -15,12 +17,33 @@
 #- While lag stays below the threshold, appends a one-line heartbeat to the log.
 #- When lag crosses the threshold, switches into LAGGING state:
 #-   - captures a full evidence snapshot (replica status, per-worker applier state, InnoDB transactions,
-#-     metadata locks, data lock waits, processlist) immediately, and again every HEAVY_EVIDENCE_INTERVAL_SECONDS
-#-     while lag remains high.
+#-     metadata locks, data lock waits, processlist) immediately, and again while lag remains high.
+#-   - the re-capture interval adapts to what evidence actually costs on this host: every section is timed, the
+#-     interval stretches so capture stays within EVIDENCE_OVERHEAD_BUDGET of wall time (HEAVY_EVIDENCE_INTERVAL_SECONDS
+#-     to HEAVY_EVIDENCE_MAX_INTERVAL_SECONDS) and doubles while lag is falling; a section slower than
+#-     EVIDENCE_SECTION_BUDGET_SECONDS is only run on every Nth capture. Entering / RECOVERED snapshots always run in full.
 #-   - between heavy snapshots, logs a lightweight per-poll line with a worker state breakdown
 #-     (idle / applying / waiting on lock / waiting on commit order) to show a stall cascading across workers.
-#- When lag drops back below the threshold, captures one final RECOVERED evidence snapshot.
+#- Every poll samples replication_applier_status_by_worker (LAST_APPLIED / APPLYING transaction timestamps) into
+#-   in-memory rolling windows, giving per-worker transactions/sec, apply latency and commit-order wait time (from
+#-   consecutive waiting_commit polls, so poll-interval granularity), and a verdict on what limits the applier:
+#-   parallelism, commit ordering, or a single large transaction.
+#- Every poll also drains new rows of performance_schema.events_statements_history for the applier worker threads
+#-   (deduplicated by EVENT_ID, kept in a bounded ring buffer) and, during a LAGGING episode, adds them up as they
+#-   arrive into timer wait, rows affected and count per schema.table + statement digest (at most
+#-   STATEMENT_AGGREGATE_MAX_KEYS pairs, the rest in '(other)'). Needs the events_statements_history consumer (ON by
+#-   default). The history only holds the last few statements per thread, so on a busy applier this is a sample.
+#-   LIMITATION: only statement-based events carry SQL text / a digest. With binlog_format=ROW (the MySQL 8.4 default)
+#-   applier row events have neither, so their cost lands in '(unknown)'. As a row-based fallback, the episode also
+#-   gets per-table write time / write count deltas from performance_schema.table_io_waits_summary_by_table (read once
+#-   at episode start and once at the end - counts all writers on the replica, not only the applier).
+#- When lag drops back below the threshold, captures one final RECOVERED evidence snapshot, preceded by a top-N
+#-   "where the applier spent its time" summary for the episode (statement digests + per-table write deltas).
 #- Everything is appended to a single timestamped log file.
+#- Optionally (METRICS_PORT != 0) serves the latest in-memory values on a Prometheus /metrics endpoint:
+#-   current lag, state, episode duration, peak lag, per-state worker counts, evidence capture duration and
+#-   per-worker applier throughput / latency / commit wait plus the applier bottleneck verdict.
+#-   Scrapes only read what the poll loop already collected - no extra MySQL queries per scrape.
 
 
 # Deployment (Rocky Linux 9.x, run as root - matches the 'local' login-path owner):
@@ -32,6 +55,7 @@
 #- 4. Confirm the login-path:                   $ sudo mysql_config_editor print --all   /// expect a 'local' entry
 #- 5. Copy the script:                          $ sudo mkdir -p /opt/mysql_replication_lag_investigation_script
 #-                                              $ sudo cp mysql_check_replication_lag.py /opt/mysql_replication_lag_investigation_script/
+#-                                              $ sudo cp ../mysql_common/mysql_connection_core.py /opt/mysql_replication_lag_investigation_script/
 #- 6. Test manually before wiring up systemd:
 #-                                              $ cd /opt/mysql_replication_lag_investigation_script && sudo python3 mysql_check_replication_lag.py
 #-
@@ -47,27 +71,53 @@
 #- 9. Install log rotation (caps the log at ~50MB - 10MB x 5 files, compressed):
 #-                                              $ sudo cp mysql_replication_lag.logrotate.example /etc/logrotate.d/mysql_replication_lag
 #-    logrotate itself runs automatically on Rocky (daily cron/timer) - no extra scheduling needed.
-#- 10. Repeat on each replica.
+#- 10. (Optional) Metrics endpoint:             $ sudo python3 -m pip install prometheus-client   /// then set METRICS_PORT (e.g. 9106)
+#-                                              $ curl -s localhost:9106/metrics | grep mysql_replication_lag_
+#- 11. Repeat on each replica.
 #- SELinux (enforcing by default on Rocky): generic systemd units usually run unconfined, but if the service fails
 #-    silently or hits unexplained permission errors, check before assuming it's a script bug: $ sudo ausearch -m avc -ts recent
 
 
+import os
+import sys
 import time
 import signal
 import subprocess
 import textwrap
-import myloginpath
+import threading
+import collections
+import math
+import re
 import pymysql
 import pymysql.cursors
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mysql_common"))
+import mysql_connection_core as core  # noqa: E402
+
 # ==================== Configurable Variables ==================== #
 LOGIN_PATH = 'local'
 CHANNEL_NAME = ''                           # Replication channel name ('' = default channel)
 POLL_INTERVAL_SECONDS = 5                   # How often to check Seconds_Behind_Source
 LAG_THRESHOLD_SECONDS = 15                  # Lag at/above this triggers LAGGING state + evidence capture
-HEAVY_EVIDENCE_INTERVAL_SECONDS = 10        # While LAGGING, re-capture full evidence this often
-RECONNECT_DELAY_SECONDS = 10                # Wait time between reconnect attempts after a connection error
+HEAVY_EVIDENCE_INTERVAL_SECONDS = 10        # While LAGGING, re-capture full evidence at most this often
+HEAVY_EVIDENCE_MAX_INTERVAL_SECONDS = 120   # ...and at least this often, however expensive capture gets
+EVIDENCE_OVERHEAD_BUDGET = 0.05             # Max share of wall time spent on evidence capture (stretches the interval)
+EVIDENCE_SECTION_BUDGET_SECONDS = 2.0       # A section slower than this is sampled: run every ceil(cost / budget) captures
+EVIDENCE_MAX_SKIPS = 5                      # ...but never skipped more than this many captures in a row
+RECONNECT_DELAY_SECONDS = 10                # Wait time between reconnect attempts after a connection error...
+RECONNECT_MAX_DELAY_SECONDS = 120           # ...doubling on every consecutive failure, up to this
+SHUTDOWN_CHECK_SECONDS = 1                  # Retry waits are slept in slices this long so SIGTERM isn't held up by a long backoff
+QUERY_TIMEOUT_SECONDS = 10                  # Server-side MAX_EXECUTION_TIME for the monitor's own poll SELECTs
+
+APPLIER_WINDOW_SECONDS = 60                 # Rolling window for per-worker throughput / latency / commit-wait stats
+LARGE_TRANSACTION_SECONDS = 30              # A single transaction applying at least this long is reported as the bottleneck
+COMMIT_WAIT_BOTTLENECK_RATIO = 0.5          # Share of worker samples in waiting_commit at/above which commit ordering is the bottleneck
+
+STATEMENT_HISTORY_ENABLED = True            # Drain applier statement history each poll for the per-table apply-cost summary
+STATEMENT_BUFFER_SIZE = 10000               # Ring buffer of the most recent applier statements kept in memory
+STATEMENT_AGGREGATE_MAX_KEYS = 1000         # Distinct table + digest pairs tracked per episode (the rest go to '(other)')
+APPLY_COST_TOP_N = 10                       # Rows in the end-of-episode apply-cost summary
 
 OK_LOG_INTERVAL_SECONDS = 60                # Only write an OK heartbeat line this often (polling stays at POLL_INTERVAL_SECONDS)
 
@@ -77,9 +127,31 @@ MYSQL_CLI_RETRY_DELAY_SECONDS = 2           # Wait between 'mysql' CLI retries
 
 LOG_FILE = "mysql_replication_lag_investigation.log"
 
+METRICS_PORT = 0                            # Port for the built-in Prometheus /metrics endpoint (0 = disabled)
+METRICS_ADDR = ''                           # Bind address for the metrics endpoint ('' = all interfaces)
+
 # ==================== Runtime State ==================== #
 _shutdown_requested = False
 
+# Latest values published to the /metrics endpoint - written by the poll loop, read by the scrape thread.
+WORKER_STATES = ("idle", "applying", "waiting_lock", "waiting_commit")
+_metrics_lock = threading.Lock()
+_metrics = {
+    "lag": None,                                    # Seconds_Behind_Source (None = NULL / unknown)
+    "state": "OK",
+    "episode_duration": 0.0,
+    "peak_lag": 0,
+    "worker_counts": dict.fromkeys(WORKER_STATES, 0),
+    "evidence_capture_duration": 0.0,
+    "evidence_captures": 0,
+    "evidence_section_durations": {},               # label -> seconds of its last run
+    "evidence_interval": HEAVY_EVIDENCE_INTERVAL_SECONDS,
+    "applier": {"workers": {}, "bottleneck": "none"},
+    "last_poll_time": 0.0,
+    "queries": 0,
+    "query_seconds": 0.0,
+}
+
 
 def handle_shutdown(signum, frame):
     global _shutdown_requested
@@ -113,47 +185,66 @@ SECTION_SEPARATOR = "\n".join(["#"] * 5)  # Divider between a LAGGING episode's
 
 # ==================== Connection Handling ==================== #
 def connect():
-    conf = myloginpath.parse(LOGIN_PATH)
-    connection = pymysql.connect(
-        **conf,
+    return core.connect(
+        LOGIN_PATH,
+        retries=0,  # ensure_connection() owns the retry loop so it can log and honour shutdown
         cursorclass=pymysql.cursors.DictCursor,
         autocommit=True,
+        read_timeout=QUERY_TIMEOUT_SECONDS * 3,  # Client-side backstop - also covers SHOW REPLICA STATUS, which ignores the hint
     )
-    return connection
+
+
+def interruptible_sleep(seconds):
+    """time.sleep in SHUTDOWN_CHECK_SECONDS slices, returning early once a shutdown is requested - a backoff of up to
+    RECONNECT_MAX_DELAY_SECONDS would otherwise outlast systemd's stop timeout (90s by default) and end in a SIGKILL."""
+    deadline = time.monotonic() + seconds
+    while not _shutdown_requested:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, SHUTDOWN_CHECK_SECONDS))
 
 
 def ensure_connection(connection):
-    """Returns a live connection, reconnecting (with retries) if needed."""
+    """Returns a live connection, reconnecting (with backoff) if needed.
+    An existing connection is reused without a ping - a dead one fails the next poll, which drops it."""
     if connection is not None:
-        try:
-            connection.ping(reconnect=False)
-            return connection
-        except Exception:
-            try:
-                connection.close()
-            except Exception:
-                pass
+        return connection
 
+    attempt = 0
     while not _shutdown_requested:
         try:
             connection = connect()
             log(f"{timestamp()} | INFO | Connected to MySQL")
             return connection
         except Exception as e:
-            log(f"{timestamp()} | ERROR | Could not connect: {e}. Retrying in {RECONNECT_DELAY_SECONDS}s...")
-            time.sleep(RECONNECT_DELAY_SECONDS)
+            delay = core.backoff_delay(attempt, RECONNECT_DELAY_SECONDS, RECONNECT_MAX_DELAY_SECONDS)
+            log(f"{timestamp()} | ERROR | Could not connect: {e}. Retrying in {delay}s...")
+            interruptible_sleep(delay)
+            attempt += 1
 
     return None
 
 
+def record_query(sql, seconds, error):
+    """Query timing hook - totals the monitor's own query count and time for /metrics."""
+    with _metrics_lock:
+        _metrics["queries"] += 1
+        _metrics["query_seconds"] += seconds
+
+
+core.add_query_hook(record_query)
+
+
 # ==================== Queries ==================== #
 def get_replica_status(cursor):
-    cursor.execute("SHOW REPLICA STATUS")
+    core.execute(cursor, "SHOW REPLICA STATUS")
     return cursor.fetchone()  # None if this server isn't a replica / channel doesn't exist
 
 
 def get_worker_rows(cursor):
-    cursor.execute(
+    core.execute(
+        cursor,
         """
         SELECT
             w.WORKER_ID,
@@ -166,20 +257,30 @@ def get_worker_rows(cursor):
             t.PROCESSLIST_COMMAND,
             t.PROCESSLIST_TIME,
             t.PROCESSLIST_STATE,
-            w.APPLYING_TRANSACTION
+            w.APPLYING_TRANSACTION,
+            w.APPLYING_TRANSACTION_START_APPLY_TIMESTAMP,
+            w.LAST_APPLIED_TRANSACTION,
+            w.LAST_APPLIED_TRANSACTION_START_APPLY_TIMESTAMP,
+            w.LAST_APPLIED_TRANSACTION_END_APPLY_TIMESTAMP,
+            tx.COUNT_STAR AS TRX_COUNT,
+            NOW(6) AS SAMPLED_AT
         FROM performance_schema.replication_applier_status_by_worker w
         LEFT JOIN performance_schema.threads t ON t.THREAD_ID = w.THREAD_ID
+        LEFT JOIN performance_schema.events_transactions_summary_by_thread_by_event_name tx
+               ON tx.THREAD_ID = w.THREAD_ID AND tx.EVENT_NAME = 'transaction'
         WHERE w.CHANNEL_NAME = %s
         ORDER BY w.WORKER_ID
         """,
         (CHANNEL_NAME,),
+        timeout=QUERY_TIMEOUT_SECONDS,
     )
     return cursor.fetchall()
 
 
 def classify_worker_state(processlist_state):
     state = (processlist_state or "").lower()
-    if not state or "waiting for more updates" in state or "read all relay log" in state:
+    if not state or "waiting for more updates" in state or "read all relay log" in state \
+            or "waiting for an event from coordinator" in state:
         return "idle"
     if "metadata lock" in state or "lock wait" in state:
         return "waiting_lock"
@@ -188,14 +289,313 @@ def classify_worker_state(processlist_state):
     return "applying"
 
 
-def get_worker_state_counts(cursor):
-    rows = get_worker_rows(cursor)
-    counts = {"idle": 0, "applying": 0, "waiting_lock": 0, "waiting_commit": 0}
+def get_worker_state_counts(rows):
+    counts = dict.fromkeys(WORKER_STATES, 0)
     for row in rows:
         counts[classify_worker_state(row["PROCESSLIST_STATE"])] += 1
     return counts
 
 
+# ==================== Applier Throughput / Latency ==================== #
+def _seconds_between(start, end):
+    """Seconds between two performance_schema timestamps; None if either is unset (zero dates come back as str)."""
+    if not isinstance(start, datetime) or not isinstance(end, datetime):
+        return None
+    return max((end - start).total_seconds(), 0.0)
+
+
+class ApplierStats(object):
+    """Rolling per-worker applier stats built from get_worker_rows() samples, one sample per poll.
+    Transaction counts come from events_transactions_summary_by_thread_by_event_name when the 'transaction'
+    instrument is enabled, falling back to counting LAST_APPLIED_TRANSACTION changes (a lower bound)."""
+
+    def __init__(self, window_seconds=APPLIER_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.workers = {}  # WORKER_ID -> per-worker state and sample deques
+
+    def sample(self, rows, now=None):
+        now = time.monotonic() if now is None else now
+        # Forget workers that no longer exist (STOP/START REPLICA, lower replica_parallel_workers) so stale windows
+        # aren't exported or fed to the bottleneck verdict:
+        current_ids = {row["WORKER_ID"] for row in rows}
+        for worker_id in [worker_id for worker_id in self.workers if worker_id not in current_ids]:
+            del self.workers[worker_id]
+
+        for row in rows:
+            worker = self.workers.setdefault(row["WORKER_ID"], {
+                "trx_total": 0,
+                "last_trx_count": None,
+                "last_applied": None,
+                "samples": collections.deque(),     # (now, trx_total, worker_state, commit_wait_seconds)
+                "latencies": collections.deque(),   # (now, apply_seconds) per newly applied transaction
+                "applying_seconds": 0.0,
+                "applying_transaction": "",
+                "commit_wait_started": None,        # when the current run of waiting_commit samples began
+            })
+
+            applied = 0
+            trx_count = row.get("TRX_COUNT")
+            if trx_count is not None and worker["last_trx_count"] is not None:
+                applied = max(trx_count - worker["last_trx_count"], 0)
+            worker["last_trx_count"] = trx_count
+
+            last_applied = row.get("LAST_APPLIED_TRANSACTION") or None
+            if last_applied and last_applied != worker["last_applied"]:
+                if worker["last_applied"] is not None:
+                    applied = max(applied, 1)
+                latency = _seconds_between(
+                    row.get("LAST_APPLIED_TRANSACTION_START_APPLY_TIMESTAMP"),
+                    row.get("LAST_APPLIED_TRANSACTION_END_APPLY_TIMESTAMP"),
+                )
+                if latency is not None:
+                    worker["latencies"].append((now, latency))
+            worker["last_applied"] = last_applied
+            worker["trx_total"] += applied
+
+            # Commit-order wait is measured at poll granularity from consecutive waiting_commit samples of the same
+            # transaction (PROCESSLIST_TIME is no use here - on applier threads it tracks the event's source age, ~lag).
+            # A run is assumed to have started right after the previous sample, so one sample counts one poll interval.
+            worker_state = classify_worker_state(row.get("PROCESSLIST_STATE"))
+            applying_transaction = row.get("APPLYING_TRANSACTION") or ""
+            if worker_state != "waiting_commit":
+                worker["commit_wait_started"] = None
+            elif worker["commit_wait_started"] is None or applying_transaction != worker["applying_transaction"]:
+                worker["commit_wait_started"] = worker["samples"][-1][0] if worker["samples"] else now
+            commit_wait = now - worker["commit_wait_started"] if worker["commit_wait_started"] is not None else 0.0
+            worker["samples"].append((now, worker["trx_total"], worker_state, commit_wait))
+
+            worker["applying_transaction"] = applying_transaction
+            applying_seconds = _seconds_between(row.get("APPLYING_TRANSACTION_START_APPLY_TIMESTAMP"), row.get("SAMPLED_AT"))
+            worker["applying_seconds"] = applying_seconds if worker["applying_transaction"] and applying_seconds is not None else 0.0
+
+            for samples in (worker["samples"], worker["latencies"]):
+                while samples and now - samples[0][0] > self.window_seconds:
+                    samples.popleft()
+
+    def summary(self):
+        """Per-worker window stats plus the bottleneck verdict. Returns plain dicts (safe to hand to the scrape thread)."""
+        workers = {}
+        for worker_id, worker in self.workers.items():
+            samples = worker["samples"]
+            if not samples:
+                continue
+            elapsed = samples[-1][0] - samples[0][0]
+            latencies = [latency for _, latency in worker["latencies"]]
+            commit_waits = [wait for _, _, state, wait in samples if state == "waiting_commit"]
+            workers[worker_id] = {
+                "trx_per_second": (samples[-1][1] - samples[0][1]) / elapsed if elapsed > 0 else 0.0,
+                "apply_latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+                "apply_latency_max": max(latencies) if latencies else 0.0,
+                "commit_wait_max": max(commit_waits) if commit_waits else 0.0,
+                "commit_wait_ratio": len(commit_waits) / len(samples),
+                "busy_ratio": sum(1 for s in samples if s[2] != "idle") / len(samples),
+                "applying_seconds": worker["applying_seconds"],
+                "applying_transaction": worker["applying_transaction"],
+                "state": samples[-1][2],  # classified state at the latest poll
+            }
+        return {"workers": workers, "bottleneck": diagnose_applier_bottleneck(workers)}
+
+
+def applying_workers(workers):
+    """The ApplierStats.summary() workers whose latest classified state is applying."""
+    return {worker_id: w for worker_id, w in workers.items() if w["state"] == "applying"}
+
+
+def diagnose_applier_bottleneck(workers):
+    """Names what is holding the applier back, from ApplierStats.summary() per-worker stats:
+        large_transaction - a worker currently applying has been on the same transaction for LARGE_TRANSACTION_SECONDS+
+                            (a worker stuck on a lock / commit order wait is not counted - that's not the transaction's size)
+        commit_ordering   - workers spend most of the window waiting for preceding transactions to commit
+        parallelism       - on average at most one worker is busy (the source's dependency tracking serialises work)
+        saturated         - workers are busy and not blocked on each other (raw apply speed / IO is the limit)
+        none              - no workers sampled, or every worker idle for the whole window"""
+    if not workers or not any(w["busy_ratio"] for w in workers.values()):
+        return "none"
+    if any(w["applying_seconds"] >= LARGE_TRANSACTION_SECONDS for w in applying_workers(workers).values()):
+        return "large_transaction"
+    if sum(w["commit_wait_ratio"] for w in workers.values()) / len(workers) >= COMMIT_WAIT_BOTTLENECK_RATIO:
+        return "commit_ordering"
+    if sum(w["busy_ratio"] for w in workers.values()) <= 1.0:
+        return "parallelism"
+    return "saturated"
+
+
+def format_applier_summary(summary):
+    """One-line applier digest for the light LAGGING poll line."""
+    workers = summary["workers"]
+    if not workers:
+        return "applier: no workers sampled"
+    total_tps = sum(w["trx_per_second"] for w in workers.values())
+    line = (
+        f"applier: {total_tps:.1f} trx/s, "
+        f"apply_latency_max={max(w['apply_latency_max'] for w in workers.values()):.3f}s, "
+        f"commit_wait_max={max(w['commit_wait_max'] for w in workers.values()):.0f}s, "
+        f"bottleneck={summary['bottleneck']}"
+    )
+    if summary["bottleneck"] == "large_transaction":
+        slowest_id, slowest = max(applying_workers(workers).items(), key=lambda item: item[1]["applying_seconds"])
+        line += f" (worker {slowest_id} applying {slowest['applying_transaction']} for {slowest['applying_seconds']:.0f}s)"
+    return line
+
+
+# ==================== Applier Statement History ==================== #
+_DML_TABLE = re.compile(
+    r"^\s*(?:INSERT|REPLACE)\s+(?:IGNORE\s+)?(?:INTO\s+)?([`\w.$]+)"
+    r"|^\s*UPDATE\s+(?:IGNORE\s+)?([`\w.$]+)"
+    r"|^\s*DELETE\s+(?:IGNORE\s+)?FROM\s+([`\w.$]+)",
+    re.IGNORECASE,
+)
+
+
+def statement_table(row):
+    """schema.table a history row touched - OBJECT_SCHEMA/OBJECT_NAME when set, otherwise the first DML target
+    in DIGEST_TEXT qualified with CURRENT_SCHEMA. '(unknown)' for statements without a recognisable target."""
+    if row.get("OBJECT_NAME"):
+        return f"{row.get('OBJECT_SCHEMA') or row.get('CURRENT_SCHEMA') or '?'}.{row['OBJECT_NAME']}"
+    match = _DML_TABLE.match(row.get("DIGEST_TEXT") or "")
+    if not match:
+        return "(unknown)"
+    name = next(group for group in match.groups() if group).replace("`", "")
+    return name if "." in name else f"{row.get('CURRENT_SCHEMA') or '?'}.{name}"
+
+
+def get_statement_history(cursor, thread_ids):
+    if not thread_ids:
+        return []
+    core.execute(
+        cursor,
+        f"""
+        SELECT h.THREAD_ID, h.EVENT_ID, h.TIMER_WAIT, h.ROWS_AFFECTED, h.CURRENT_SCHEMA,
+               h.OBJECT_SCHEMA, h.OBJECT_NAME, h.DIGEST, LEFT(h.DIGEST_TEXT, 200) AS DIGEST_TEXT
+        FROM performance_schema.events_statements_history h
+        WHERE h.THREAD_ID IN ({", ".join(["%s"] * len(thread_ids))})
+          AND h.END_EVENT_ID IS NOT NULL
+        """,
+        tuple(thread_ids),
+        timeout=QUERY_TIMEOUT_SECONDS,
+    )
+    return cursor.fetchall()
+
+
+class ApplierStatementHistory(object):
+    """Bounded ring buffer of recently completed applier statements plus per-episode cost totals per schema.table + digest.
+    Totals are added up as rows are drained, so a long episode is counted in full however many statements it applies.
+    Rows are deduplicated by keeping the highest EVENT_ID already seen for each worker thread."""
+
+    def __init__(self, buffer_size=STATEMENT_BUFFER_SIZE):
+        self.buffer = collections.deque(maxlen=buffer_size)
+        self.last_event_ids = {}    # THREAD_ID -> highest EVENT_ID drained
+        self.totals = {}            # (table, digest) -> {"count", "timer_wait", "rows_affected", "digest_text"}
+        self.collecting = False
+
+    def drain(self, rows):
+        """Adds history rows not seen yet to the ring buffer (and to the episode totals while an episode is open);
+        returns how many were new."""
+        new_rows = 0
+        for row in sorted(rows, key=lambda r: (r["THREAD_ID"], r["EVENT_ID"])):
+            if row["EVENT_ID"] <= self.last_event_ids.get(row["THREAD_ID"], 0):
+                continue
+            self.last_event_ids[row["THREAD_ID"]] = row["EVENT_ID"]
+            self.buffer.append(row)
+            new_rows += 1
+            if self.collecting:
+                self.add(row)
+        return new_rows
+
+    def add(self, row):
+        key = (statement_table(row), row.get("DIGEST") or "")
+        if key not in self.totals and len(self.totals) >= STATEMENT_AGGREGATE_MAX_KEYS:
+            key = ("(other)", "")
+        totals = self.totals.setdefault(key, {"count": 0, "timer_wait": 0, "rows_affected": 0,
+                                              "digest_text": row.get("DIGEST_TEXT") or ""})
+        totals["count"] += 1
+        totals["timer_wait"] += row.get("TIMER_WAIT") or 0
+        totals["rows_affected"] += row.get("ROWS_AFFECTED") or 0
+
+    def start_episode(self):
+        self.totals = {}
+        self.collecting = True
+
+    def end_episode(self, top_n=APPLY_COST_TOP_N):
+        """Stops collecting. Returns the episode's top_n (table, digest, totals) by timer wait and the total timer wait."""
+        self.collecting = False
+        ranked = sorted(self.totals.items(), key=lambda item: item[1]["timer_wait"], reverse=True)
+        total_wait = sum(totals["timer_wait"] for totals in self.totals.values())
+        return [(table, digest, totals) for (table, digest), totals in ranked[:top_n]], total_wait
+
+
+def get_table_write_totals(cursor):
+    """Cumulative write count / write timer per user table - the row-based fallback for the apply-cost summary."""
+    core.execute(
+        cursor,
+        """
+        SELECT OBJECT_SCHEMA, OBJECT_NAME, COUNT_WRITE, SUM_TIMER_WRITE
+        FROM performance_schema.table_io_waits_summary_by_table
+        WHERE OBJECT_TYPE = 'TABLE'
+          AND OBJECT_SCHEMA NOT IN ('mysql', 'performance_schema', 'sys', 'information_schema')
+          AND COUNT_WRITE > 0
+        """,
+        timeout=QUERY_TIMEOUT_SECONDS,
+    )
+    return {f"{row['OBJECT_SCHEMA']}.{row['OBJECT_NAME']}": (row["COUNT_WRITE"], row["SUM_TIMER_WRITE"])
+            for row in cursor.fetchall()}
+
+
+def snapshot_table_writes(cursor):
+    """get_table_write_totals() that never fails the poll - on a large schema the scan can hit QUERY_TIMEOUT_SECONDS,
+    and the episode's state transition / evidence matter more than the fallback table. Returns None on error."""
+    try:
+        return get_table_write_totals(cursor)
+    except pymysql.err.Error as e:
+        log(f"{timestamp()} | WARN | table_io_waits_summary_by_table snapshot failed: {e}")
+        return None
+
+
+def table_write_deltas(before, after, top_n=APPLY_COST_TOP_N):
+    """Top_n (table, write count, write timer) by timer growth between two get_table_write_totals() snapshots.
+    A counter that went backwards (summary truncated / table recreated) counts from zero."""
+    deltas = []
+    for table, (count, timer) in after.items():
+        count_before, timer_before = before.get(table, (0, 0))
+        if count < count_before or timer < timer_before:
+            count_before, timer_before = 0, 0
+        if count > count_before:
+            deltas.append((table, count - count_before, timer - timer_before))
+    return sorted(deltas, key=lambda delta: delta[2], reverse=True)[:top_n]
+
+
+def format_table_write_summary(before, after):
+    """Text table for the row-based fallback from two snapshot_table_writes() results - SUM_TIMER_WRITE is in picoseconds."""
+    if before is None or after is None:
+        return "    (no baseline - the table_io_waits_summary_by_table snapshot failed at episode " + ("start)" if before is None else "end)")
+    deltas = table_write_deltas(before, after)
+    if not deltas:
+        return "    (no table writes recorded - is the wait/io/table/sql/handler instrument enabled?)"
+    total_timer = sum(timer for _, _, timer in deltas) or 1
+    header = f"    {'Table':<40} | {'Write s':>9} | {'Share':>6} | {'Writes':>9}"
+    rows = [
+        f"    {table:<40} | {timer / 1e12:>9.3f} | {100 * timer / total_timer:>5.1f}% | {count:>9}"
+        for table, count, timer in deltas
+    ]
+    return "\n".join([header, "    " + "-" * (len(header) - 4)] + rows)
+
+
+def format_apply_cost_summary(top, total_wait):
+    """Text table for the RECOVERED block - TIMER_WAIT is in picoseconds."""
+    if not top:
+        return "    (no applier statements captured - is the events_statements_history consumer enabled?)"
+    total_wait = total_wait or 1
+    header = f"    {'Table':<40} | {'Apply s':>9} | {'Share':>6} | {'Count':>7} | {'Rows':>9} | Digest"
+    rows = [
+        f"    {table:<40} | {totals['timer_wait'] / 1e12:>9.3f} | {100 * totals['timer_wait'] / total_wait:>5.1f}% | "
+        f"{totals['count']:>7} | {totals['rows_affected']:>9} | {totals['digest_text'][:80]}"
+        for table, _, totals in top
+    ]
+    if any(table == "(unknown)" for table, _, _ in top):
+        rows.append("    ((unknown) = row-based events with no SQL text / digest - see the per-table write deltas below)")
+    return "\n".join([header, "    " + "-" * (len(header) - 4)] + rows)
+
+
 # ==================== Raw mysql CLI Evidence Queries ==================== #
 EVIDENCE_QUERIES = {
     "APPLIER WORKERS": """
@@ -282,17 +682,215 @@ def run_mysql_cli(sql, vertical=False):
 
 
 # ==================== Evidence Capture ==================== #
-def capture_evidence():
-    """Dumps the raw mysql CLI output for each diagnostic query and returns it as one text block."""
-    blocks = ["    [REPLICA STATUS]", run_mysql_cli("SHOW REPLICA STATUS", vertical=True)]
-
-    for label, sql in EVIDENCE_QUERIES.items():
+class EvidenceThrottle(object):
+    """Tracks what each evidence section costs on this host and decides how often heavy capture may run."""
+
+    def __init__(self):
+        self.section_costs = {}     # label -> smoothed seconds per run
+        self.section_skips = {}     # label -> captures skipped in a row
+        self.capture_cost = 0.0     # smoothed wall time per capture
+
+    def should_run(self, label, force=False):
+        cost = self.section_costs.get(label)
+        if force or cost is None or cost <= EVIDENCE_SECTION_BUDGET_SECONDS:
+            return True
+        every = min(math.ceil(cost / EVIDENCE_SECTION_BUDGET_SECONDS), EVIDENCE_MAX_SKIPS + 1)
+        return self.section_skips.get(label, 0) + 1 >= every
+
+    def record(self, label, seconds):
+        previous = self.section_costs.get(label)
+        self.section_costs[label] = seconds if previous is None else (previous + seconds) / 2
+        self.section_skips[label] = 0
+
+    def skip(self, label):
+        self.section_skips[label] = self.section_skips.get(label, 0) + 1
+
+    def next_interval(self, lag_change):
+        """Seconds to wait before the next heavy capture, given how lag moved since the last one."""
+        interval = max(HEAVY_EVIDENCE_INTERVAL_SECONDS, self.capture_cost / EVIDENCE_OVERHEAD_BUDGET)
+        if lag_change < 0:
+            interval *= 2  # recovering - fresh evidence is worth less than the load it adds
+        return min(interval, HEAVY_EVIDENCE_MAX_INTERVAL_SECONDS)
+
+
+def capture_evidence(throttle, force=False):
+    """Dumps the raw mysql CLI output for each diagnostic query and returns it as one text block.
+    Sections over budget are skipped per the throttle unless force is set."""
+    started = time.monotonic()
+    sections = [("REPLICA STATUS", "SHOW REPLICA STATUS", True)]
+    sections += [(label, sql.format(channel=CHANNEL_NAME), False) for label, sql in EVIDENCE_QUERIES.items()]
+
+    blocks = []
+    durations = {}
+    for label, sql, vertical in sections:
         blocks.append(f"    [{label}]")
-        blocks.append(run_mysql_cli(sql.format(channel=CHANNEL_NAME)))
-
+        if not throttle.should_run(label, force):
+            throttle.skip(label)
+            blocks.append(f"    (skipped - last run took {throttle.section_costs[label]:.2f}s, budget {EVIDENCE_SECTION_BUDGET_SECONDS}s)")
+            continue
+        section_started = time.monotonic()
+        blocks.append(run_mysql_cli(sql, vertical=vertical))
+        durations[label] = time.monotonic() - section_started
+        throttle.record(label, durations[label])
+
+    elapsed = time.monotonic() - started
+    throttle.capture_cost = elapsed if not throttle.capture_cost else (throttle.capture_cost + elapsed) / 2
+    with _metrics_lock:
+        _metrics["evidence_capture_duration"] = elapsed
+        _metrics["evidence_captures"] += 1
+        _metrics["evidence_section_durations"] = dict(_metrics["evidence_section_durations"], **durations)
+    timings = ", ".join(f"{label} {seconds:.2f}s" for label, seconds in durations.items())
+    blocks.append(f"    (capture took {elapsed:.2f}s: {timings or 'all sections skipped'})")
     return "\n".join(blocks)
 
 
+# ==================== Prometheus Metrics Endpoint ==================== #
+def update_metrics(**values):
+    """Publishes the latest poll results for the /metrics endpoint."""
+    with _metrics_lock:
+        _metrics.update(values)
+
+
+class ReplicationLagCollector(object):
+    """Custom collector - rebuilds every metric from the in-memory snapshot on each scrape (no MySQL queries)."""
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        with _metrics_lock:
+            snapshot = dict(_metrics, worker_counts=dict(_metrics["worker_counts"]))
+        applier = snapshot["applier"]
+
+        lag = GaugeMetricFamily(
+            "mysql_replication_lag_seconds",
+            "Latest Seconds_Behind_Source seen by the monitor (NaN if NULL)",
+            labels=["channel"],
+        )
+        lag.add_metric([CHANNEL_NAME], float("nan") if snapshot["lag"] is None else float(snapshot["lag"]))
+        yield lag
+
+        state = GaugeMetricFamily(
+            "mysql_replication_lag_state",
+            "Monitor state (1 for the current state, 0 otherwise)",
+            labels=["channel", "state"],
+        )
+        for name in ("OK", "LAGGING"):
+            state.add_metric([CHANNEL_NAME, name], 1.0 if snapshot["state"] == name else 0.0)
+        yield state
+
+        episode_duration = GaugeMetricFamily(
+            "mysql_replication_lag_episode_duration_seconds",
+            "Duration of the current LAGGING episode (0 when OK)",
+            labels=["channel"],
+        )
+        episode_duration.add_metric([CHANNEL_NAME], snapshot["episode_duration"])
+        yield episode_duration
+        peak = GaugeMetricFamily(
+            "mysql_replication_lag_peak_seconds",
+            "Peak lag of the current (or most recent) LAGGING episode",
+            labels=["channel"],
+        )
+        peak.add_metric([CHANNEL_NAME], float(snapshot["peak_lag"]))
+        yield peak
+
+        workers = GaugeMetricFamily(
+            "mysql_replication_lag_workers",
+            "Applier workers per state as of the last poll",
+            labels=["channel", "worker_state"],
+        )
+        for name in WORKER_STATES:
+            workers.add_metric([CHANNEL_NAME, name], float(snapshot["worker_counts"][name]))
+        yield workers
+
+        applier_metrics = (
+            ("trx_per_second", "mysql_replication_lag_applier_worker_transactions_per_second",
+             "Transactions applied per second by each worker over the rolling window"),
+            ("apply_latency_avg", "mysql_replication_lag_applier_worker_apply_latency_seconds",
+             "Average start-to-end apply time of transactions finished in the rolling window"),
+            ("commit_wait_max", "mysql_replication_lag_applier_worker_commit_order_wait_seconds",
+             "Longest run of consecutive waiting_commit polls for one transaction in the rolling window (poll granularity)"),
+            ("applying_seconds", "mysql_replication_lag_applier_worker_applying_seconds",
+             "How long the worker has been applying its current transaction"),
+        )
+        for key, name, description in applier_metrics:
+            family = GaugeMetricFamily(name, description, labels=["channel", "worker_id"])
+            for worker_id, stats in applier["workers"].items():
+                family.add_metric([CHANNEL_NAME, str(worker_id)], stats[key])
+            yield family
+
+        bottleneck = GaugeMetricFamily(
+            "mysql_replication_lag_applier_bottleneck",
+            "Applier bottleneck verdict (1 for the current verdict, 0 otherwise)",
+            labels=["channel", "bottleneck"],
+        )
+        for name in ("none", "parallelism", "commit_ordering", "large_transaction", "saturated"):
+            bottleneck.add_metric([CHANNEL_NAME, name], 1.0 if applier["bottleneck"] == name else 0.0)
+        yield bottleneck
+
+        capture_duration = GaugeMetricFamily(
+            "mysql_replication_lag_evidence_capture_duration_seconds",
+            "Wall time of the last full evidence capture",
+            labels=["channel"],
+        )
+        capture_duration.add_metric([CHANNEL_NAME], snapshot["evidence_capture_duration"])
+        yield capture_duration
+        sections = GaugeMetricFamily(
+            "mysql_replication_lag_evidence_section_duration_seconds",
+            "Wall time of the last run of each evidence section",
+            labels=["channel", "section"],
+        )
+        for label, seconds in snapshot["evidence_section_durations"].items():
+            sections.add_metric([CHANNEL_NAME, label], seconds)
+        yield sections
+        interval = GaugeMetricFamily(
+            "mysql_replication_lag_evidence_interval_seconds",
+            "Current adaptive interval between heavy evidence captures",
+            labels=["channel"],
+        )
+        interval.add_metric([CHANNEL_NAME], snapshot["evidence_interval"])
+        yield interval
+        yield CounterMetricFamily(
+            "mysql_replication_lag_evidence_captures",
+            "Full evidence captures taken since start",
+            value=snapshot["evidence_captures"],
+        )
+        yield CounterMetricFamily(
+            "mysql_replication_lag_monitor_queries",
+            "Queries issued by the monitor's own poll loop since start",
+            value=snapshot["queries"],
+        )
+        yield CounterMetricFamily(
+            "mysql_replication_lag_monitor_query_seconds",
+            "Time spent in the monitor's own poll-loop queries since start",
+            value=snapshot["query_seconds"],
+        )
+        yield GaugeMetricFamily(
+            "mysql_replication_lag_last_poll_timestamp_seconds",
+            "Unix time of the last successful poll",
+            value=snapshot["last_poll_time"],
+        )
+
+
+def start_metrics_server():
+    """Starts the /metrics endpoint in a background thread if METRICS_PORT is set.
+    prometheus_client is only imported here, so it stays an optional dependency."""
+    if not METRICS_PORT:
+        return
+    try:
+        from prometheus_client import start_http_server, REGISTRY
+    except ImportError:
+        log(f"{timestamp()} | ERROR | METRICS_PORT={METRICS_PORT} but prometheus_client is not installed - metrics endpoint disabled")
+        return
+
+    try:
+        REGISTRY.register(ReplicationLagCollector())
+        start_http_server(METRICS_PORT, addr=METRICS_ADDR or "0.0.0.0")
+    except OSError as e:
+        log(f"{timestamp()} | ERROR | Could not start metrics endpoint on :{METRICS_PORT}: {e} - continuing without it")
+        return
+    log(f"{timestamp()} | INFO | Metrics endpoint listening on :{METRICS_PORT}/metrics")
+
+
 # ==================== Main Loop ==================== #
 def main():
     connection = None
@@ -300,9 +898,16 @@ def main():
     entering_time = None
     peak_lag = 0
     last_heavy_capture_time = 0
+    table_writes_at_start = None
+    poll_failures = 0
+    lag_at_last_capture = 0
+    throttle = EvidenceThrottle()
     last_ok_log_time = 0
+    applier = ApplierStats()
+    statements = ApplierStatementHistory()
 
     log(f"\n--- Starting replication lag monitor: {timestamp()} ---")
+    start_metrics_server()
 
     while not _shutdown_requested:
         connection = ensure_connection(connection)
@@ -315,11 +920,20 @@ def main():
 
             if replica_status is None:
                 log(f"{timestamp()} | ERROR | SHOW REPLICA STATUS returned no rows - is this a replica? Retrying in {RECONNECT_DELAY_SECONDS}s...")
-                time.sleep(RECONNECT_DELAY_SECONDS)
+                interruptible_sleep(RECONNECT_DELAY_SECONDS)
                 continue
 
             lag = replica_status.get("Seconds_Behind_Source")
             now = time.time()
+            worker_rows = get_worker_rows(cursor)
+            counts = get_worker_state_counts(worker_rows)
+            applier.sample(worker_rows)
+            if STATEMENT_HISTORY_ENABLED:
+                if state == "OK" and lag is not None and lag >= LAG_THRESHOLD_SECONDS:
+                    statements.start_episode()  # before draining, so the entering poll's statements are counted
+                statements.drain(get_statement_history(cursor, [row["THREAD_ID"] for row in worker_rows if row.get("THREAD_ID")]))
+            applier_summary = applier.summary()
+            update_metrics(lag=lag, last_poll_time=now, worker_counts=counts, applier=applier_summary)
 
             if lag is None:
                 log(f"{timestamp()} | ERROR | Seconds_Behind_Source is NULL (IO/SQL thread stopped?) - Last_SQL_Error: {replica_status.get('Last_SQL_Error') or '(none)'}")
@@ -329,53 +943,80 @@ def main():
                     state = "LAGGING"
                     entering_time = now
                     peak_lag = lag
-                    evidence_text = capture_evidence()
+                    table_writes_at_start = None  # never fall back to a previous episode's baseline
+                    update_metrics(state=state, episode_duration=0.0, peak_lag=peak_lag)
+                    evidence_text = capture_evidence(throttle, force=True)
                     log(
                         f"\n\n{state_banner('LAGGING')}\n"
                         f"{timestamp()} | LAGGING (entering) | lag={lag}s\n"
                         f"    --- evidence snapshot ---\n{evidence_text}\n"
                     )
                     last_heavy_capture_time = now
+                    lag_at_last_capture = lag
+                    if STATEMENT_HISTORY_ENABLED:
+                        table_writes_at_start = snapshot_table_writes(cursor)
                 else:
                     peak_lag = max(peak_lag, lag)
-                    if now - last_heavy_capture_time >= HEAVY_EVIDENCE_INTERVAL_SECONDS:
-                        evidence_text = capture_evidence()
-                        log(f"{timestamp()} | LAGGING (ongoing) | lag={lag}s\n    --- evidence snapshot ---\n{evidence_text}")
+                    update_metrics(episode_duration=now - entering_time, peak_lag=peak_lag)
+                    heavy_interval = throttle.next_interval(lag - lag_at_last_capture)
+                    update_metrics(evidence_interval=heavy_interval)
+                    if now - last_heavy_capture_time >= heavy_interval:
+                        evidence_text = capture_evidence(throttle)
+                        log(
+                            f"{timestamp()} | LAGGING (ongoing) | lag={lag}s | heavy_interval={heavy_interval:.0f}s\n"
+                            f"    --- evidence snapshot ---\n{evidence_text}"
+                        )
                         last_heavy_capture_time = now
+                        lag_at_last_capture = lag
                     else:
-                        counts = get_worker_state_counts(cursor)
                         log(
                             f"{timestamp()} | LAGGING (ongoing) | lag={lag}s | "
                             f"workers: {counts['idle']} idle, {counts['applying']} applying, "
-                            f"{counts['waiting_lock']} waiting_lock, {counts['waiting_commit']} waiting_commit"
+                            f"{counts['waiting_lock']} waiting_lock, {counts['waiting_commit']} waiting_commit | "
+                            f"{format_applier_summary(applier_summary)}"
                         )
 
             else:
                 if state == "LAGGING":
                     duration = int(now - entering_time)
-                    evidence_text = capture_evidence()
+                    evidence_text = capture_evidence(throttle, force=True)
+                    if STATEMENT_HISTORY_ENABLED:
+                        apply_cost = format_apply_cost_summary(*statements.end_episode())
+                        table_writes = format_table_write_summary(table_writes_at_start, snapshot_table_writes(cursor))
+                    else:
+                        apply_cost = table_writes = "    (disabled)"
                     log(
                         f"\n\n{SECTION_SEPARATOR}\n\n{state_banner('RECOVERED')}\n"
                         f"{timestamp()} | RECOVERED | lag={lag}s | duration={duration}s | peak_lag={peak_lag}s\n"
+                        f"    {format_applier_summary(applier_summary)}\n"
+                        f"    --- where the applier spent its time (top {APPLY_COST_TOP_N} by apply time) ---\n"
+                        f"{apply_cost}\n"
+                        f"    --- per-table write time during the episode (table_io_waits_summary_by_table - row-based fallback, all writers) ---\n"
+                        f"{table_writes}\n"
                         f"    --- recovered snapshot ---\n"
                         f"{evidence_text}\n"
                     )
                     state = "OK"
+                    update_metrics(state=state, episode_duration=0.0, evidence_interval=HEAVY_EVIDENCE_INTERVAL_SECONDS)
                     last_ok_log_time = now
                 elif now - last_ok_log_time >= OK_LOG_INTERVAL_SECONDS:
                     log(f"{timestamp()} | OK | lag={lag}s")
                     last_ok_log_time = now
 
         except pymysql.err.Error as e:
-            log(f"{timestamp()} | ERROR | MySQL error during poll: {e}")
+            # Same backoff as a failed connect - a dead connection is only found here now that polls skip the ping:
+            delay = core.backoff_delay(poll_failures, RECONNECT_DELAY_SECONDS, RECONNECT_MAX_DELAY_SECONDS)
+            poll_failures += 1
+            log(f"{timestamp()} | ERROR | MySQL error during poll: {e}. Retrying in {delay}s...")
             try:
                 connection.close()
             except Exception:
                 pass
             connection = None
-            time.sleep(RECONNECT_DELAY_SECONDS)
+            interruptible_sleep(delay)
             continue
 
+        poll_failures = 0
         time.sleep(POLL_INTERVAL_SECONDS)
 
     log(f"--- Stopping replication lag monitor: {timestamp()} ---")
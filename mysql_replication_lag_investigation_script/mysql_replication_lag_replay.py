@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+
+
+# Requirements:
+# -------------------
+#- $ python3 --version                  /// Check Python Version
+#- $ pip3 install myloginpath PyMySQL   /// Same as the monitor - it is imported as-is, only its I/O is replaced
+#- No MySQL server, replica or 'mysql' CLI needed.
+
+
+# Description:
+# -------------------
+#- Offline replay / benchmark harness for mysql_check_replication_lag.py.
+#- Runs the monitor's real main() against a scripted stand-in for the PyMySQL connection and the mysql CLI:
+#-   - SHOW REPLICA STATUS returns the next point of a recorded lag curve on every poll,
+#-   - the per-worker applier query returns scripted worker rows,
+#-   - 'mysql' CLI evidence calls return recorded result sets (and can take a scripted amount of time).
+#- time.time / time.monotonic / time.sleep and the monitor's log timestamps are replaced by a virtual clock, so a
+#-   2 hour episode replays in seconds, every run of the same scenario makes the same decisions and the replay log
+#-   carries the scenario's own (virtual) times.
+#- Reports, per episode: polls, real per-poll latency, CPU time, bytes logged, queries issued and mysql CLI calls -
+#-   so performance changes to the monitor can be compared offline, before and after.
+#- If the scenario has an 'expect' block, the deterministic (non-timing) results are checked against it and the
+#-   script exits 1 on any mismatch - a missed RECOVERED transition, an extra CLI capture or a changed query count fails.
+
+
+# Usage:
+# -------------------
+#- $ python3 mysql_replication_lag_replay.py mysql_replication_lag_replay.example.json
+#- $ python3 mysql_replication_lag_replay.py scenario.json --repeat 5 --json          /// best-of-5 CPU, JSON report
+#- $ python3 mysql_replication_lag_replay.py scenario.json --lag-from-log mysql_replication_lag_investigation.log
+#-   (replaces the scenario's lag_curve with the lag values recorded in an existing monitor log - 'Seconds_Behind_Source
+#-   is NULL' ERROR lines become null points)
+#-
+#- Scenario file (JSON):
+#-   lag_curve      - Seconds_Behind_Source per poll (null = NULL). The replay stops after the last point.
+#-   workers        - applier worker rows returned every poll (columns as in get_worker_rows()).
+#-                    *_TIMESTAMP columns given as numbers are "seconds before the sample"; TRX_PER_POLL=n makes
+#-                    TRX_COUNT / LAST_APPLIED_TRANSACTION advance by n per poll.
+#-   worker_frames  - optional {"<poll index>": [rows]} - replaces 'workers' from that poll onwards.
+#-   statements     - optional applier statement history rows (columns as in get_statement_history()) returned every
+#-                    poll with a fresh EVENT_ID per THREAD_ID, as if each worker finished them since the last poll.
+#-   table_io       - optional table_io_waits_summary_by_table rows (OBJECT_SCHEMA, OBJECT_NAME, COUNT_WRITE,
+#-                    SUM_TIMER_WRITE); the two counters are per-poll increments, returned accumulated.
+#-   evidence       - {"<section label>": {"output": "...", "seconds": 0.3}} - recorded mysql CLI output per evidence
+#-                    section (labels as in EVIDENCE_QUERIES, plus "REPLICA STATUS") and its simulated run time.
+#-   settings       - optional overrides of the monitor's configurable variables, e.g. {"LAG_THRESHOLD_SECONDS": 15}.
+#-   expect         - optional expected results: top-level 'polls' / 'total_bytes_logged', and 'segments' - a list
+#-                    (one per segment, in order) of {name, polls, lag_peak, queries, cli_calls, bytes_logged,
+#-                    simulated_mysql_seconds}. Only the keys given are checked; timing columns can't be expected.
+
+
+import os
+import re
+import io
+import sys
+import copy
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mysql_check_replication_lag as monitor  # noqa: E402
+
+# ==================== Configurable Variables ==================== #
+VIRTUAL_EPOCH = datetime(2026, 1, 1)        # Virtual clock start (what NOW(6) returns at poll 0)
+SOURCE_UUID = "3e11fa47-71ca-11e1-9e33-c80aa9429562"  # GTID source used for generated LAST_APPLIED_TRANSACTION values
+
+_INITIAL_METRICS = copy.deepcopy(monitor._metrics)
+
+
+# ==================== Virtual Clock ==================== #
+class VirtualClock(object):
+    """Stands in for the 'time' module inside the monitor. sleep() advances virtual time instantly and marks the
+    end of a poll, so the harness can close per-poll measurements there."""
+
+    def __init__(self, on_sleep):
+        self.now = 0.0
+        self.on_sleep = on_sleep
+
+    def time(self):
+        return VIRTUAL_EPOCH.timestamp() + self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.on_sleep()
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def datetime(self):
+        return VIRTUAL_EPOCH + timedelta(seconds=self.now)
+
+
+# ==================== Fake PyMySQL ==================== #
+class FakeCursor(object):
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.rows = self.replay.answer(sql)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection(object):
+
+    def __init__(self, replay):
+        self.replay = replay
+
+    def cursor(self):
+        return FakeCursor(self.replay)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+# ==================== Fake mysql CLI ==================== #
+class FakeCompletedProcess(object):
+
+    def __init__(self, stdout):
+        self.returncode = 0
+        self.stdout = stdout
+        self.stderr = ""
+
+
+class FakeSubprocess(object):
+    """Stands in for the 'subprocess' module inside the monitor - answers 'mysql' CLI calls from the scenario."""
+    TimeoutExpired = monitor.subprocess.TimeoutExpired
+
+    def __init__(self, replay):
+        self.replay = replay
+
+    def run(self, args, capture_output=True, text=True, timeout=None):
+        return FakeCompletedProcess(self.replay.answer_cli(args[-1]))
+
+
+# ==================== Replay ==================== #
+def _section_label(sql):
+    """Maps a mysql CLI statement back to its evidence section label."""
+    if sql.startswith("SHOW REPLICA STATUS"):
+        return "REPLICA STATUS"
+    for label, template in monitor.EVIDENCE_QUERIES.items():
+        if sql == template.format(channel=monitor.CHANNEL_NAME):
+            return label
+    return "UNKNOWN"
+
+
+def _query_kind(sql):
+    if "SHOW REPLICA STATUS" in sql:
+        return "replica_status"
+    if "replication_applier_status_by_worker" in sql:
+        return "worker_rows"
+    if "events_statements_history" in sql:
+        return "statement_history"
+    if "table_io_waits_summary_by_table" in sql:
+        return "table_io"
+    return "other"
+
+
+class Replay(object):
+    """Feeds one scenario through monitor.main() and collects per-poll and per-episode measurements."""
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.lag_curve = scenario["lag_curve"]
+        self.frames = {0: scenario.get("workers", [])}
+        self.frames.update({int(index): rows for index, rows in scenario.get("worker_frames", {}).items()})
+        self.evidence = scenario.get("evidence", {})
+        self.trx_counts = {}  # WORKER_ID -> generated TRX_COUNT so far
+        self.statements = scenario.get("statements", [])
+        self.event_ids = {}   # THREAD_ID -> last generated EVENT_ID
+        self.table_io = scenario.get("table_io", [])
+
+        self.clock = VirtualClock(self.end_poll)
+        self.poll_index = -1
+        self.poll_queries = {}
+        self.poll_cli_calls = 0
+        self.poll_started = None
+        self.log_size = 0
+        self.polls = []
+
+    # ---------- Answers ---------- #
+    def answer(self, sql):
+        kind = _query_kind(sql)
+        if kind == "replica_status":
+            self.start_poll()  # every poll starts with SHOW REPLICA STATUS
+        self.poll_queries[kind] = self.poll_queries.get(kind, 0) + 1
+
+        if kind == "replica_status":
+            return [{"Seconds_Behind_Source": self.lag_curve[self.poll_index], "Last_SQL_Error": ""}]
+        if kind == "worker_rows":
+            return self.worker_rows()
+        if kind == "statement_history":
+            return self.statement_rows()
+        if kind == "table_io":
+            polls = self.poll_index + 1
+            return [dict(row, COUNT_WRITE=row["COUNT_WRITE"] * polls, SUM_TIMER_WRITE=row["SUM_TIMER_WRITE"] * polls)
+                    for row in self.table_io]
+        return []
+
+    def answer_cli(self, sql):
+        self.poll_cli_calls += 1
+        section = self.evidence.get(_section_label(sql), {})
+        self.clock.advance(section.get("seconds", 0.0))
+        return section.get("output", "")
+
+    def worker_rows(self):
+        frame = self.frames[max(index for index in self.frames if index <= self.poll_index)]
+        sampled_at = self.clock.datetime()
+        rows = []
+        for template in frame:
+            row = {column: value for column, value in template.items() if column != "TRX_PER_POLL"}
+            for column, value in template.items():
+                if column.endswith("_TIMESTAMP") and isinstance(value, (int, float)):
+                    row[column] = sampled_at - timedelta(seconds=value)
+            if "TRX_PER_POLL" in template:
+                count = self.trx_counts.get(template["WORKER_ID"], 0) + template["TRX_PER_POLL"]
+                self.trx_counts[template["WORKER_ID"]] = count
+                row["TRX_COUNT"] = count
+                row["LAST_APPLIED_TRANSACTION"] = f"{SOURCE_UUID}:{count}"
+            row["SAMPLED_AT"] = sampled_at
+            rows.append(row)
+        return rows
+
+    def statement_rows(self):
+        rows = []
+        for template in self.statements:
+            event_id = self.event_ids.get(template["THREAD_ID"], 0) + 1
+            self.event_ids[template["THREAD_ID"]] = event_id
+            rows.append(dict(template, EVENT_ID=event_id))
+        return rows
+
+    # ---------- Per-poll measurement ---------- #
+    def start_poll(self):
+        self.poll_index += 1
+        self.poll_queries = {}
+        self.poll_cli_calls = 0
+        self.poll_started = (time.perf_counter(), time.process_time(), self.clock.now)
+
+    def end_poll(self):
+        if self.poll_started is None:
+            return
+        wall_started, cpu_started, virtual_started = self.poll_started
+        log_size = os.path.getsize(monitor.LOG_FILE) if os.path.exists(monitor.LOG_FILE) else 0
+        self.polls.append({
+            "poll": self.poll_index,
+            "lag": self.lag_curve[self.poll_index],
+            "state": monitor._metrics["state"],
+            "latency": time.perf_counter() - wall_started,
+            "cpu": time.process_time() - cpu_started,
+            "simulated_mysql_seconds": self.clock.now - virtual_started,
+            "bytes_logged": log_size - self.log_size,
+            "queries": sum(self.poll_queries.values()),
+            "cli_calls": self.poll_cli_calls,
+        })
+        self.log_size = log_size
+        self.poll_started = None
+        if self.poll_index + 1 >= len(self.lag_curve):
+            monitor._shutdown_requested = True
+
+    # ---------- Run ---------- #
+    def run(self):
+        settings = self.scenario.get("settings", {})
+        patched = {name: getattr(monitor, name) for name in ["time", "timestamp", "subprocess", "connect", "LOG_FILE"] + list(settings)}
+        log_dir = tempfile.mkdtemp(prefix="lag_replay_")
+        try:
+            monitor.time = self.clock
+            monitor.timestamp = lambda: self.clock.datetime().strftime("%Y-%m-%d %H:%M:%S")
+            monitor.subprocess = FakeSubprocess(self)
+            monitor.connect = lambda: FakeConnection(self)
+            monitor.LOG_FILE = os.path.join(log_dir, "replay.log")
+            for name, value in settings.items():
+                setattr(monitor, name, value)
+            monitor._shutdown_requested = False
+            monitor._metrics.clear()
+            monitor._metrics.update(copy.deepcopy(_INITIAL_METRICS))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                monitor.main()
+            self.log_size = os.path.getsize(monitor.LOG_FILE)
+        finally:
+            for name, value in patched.items():
+                setattr(monitor, name, value)
+            if os.path.exists(os.path.join(log_dir, "replay.log")):
+                os.remove(os.path.join(log_dir, "replay.log"))
+            os.rmdir(log_dir)
+        return self.report()
+
+    def report(self):
+        """Groups polls into OK stretches and LAGGING episodes (the RECOVERED poll closes its episode)."""
+        episodes = []
+        current = None
+        episode_count = 0
+        previous_state = "OK"
+        for poll in self.polls:
+            if poll["state"] == "LAGGING" and previous_state == "OK":
+                episode_count += 1
+            in_episode = poll["state"] == "LAGGING" or previous_state == "LAGGING"
+            name = f"episode {episode_count}" if in_episode else "OK"
+            if current is None or current["name"] != name:
+                current = {"name": name, "polls": []}
+                episodes.append(current)
+            current["polls"].append(poll)
+            previous_state = poll["state"]
+        return {
+            "polls": len(self.polls),
+            "total_bytes_logged": self.log_size,
+            "segments": [summarize(episode["name"], episode["polls"]) for episode in episodes],
+        }
+
+
+def summarize(name, polls):
+    latencies = sorted(poll["latency"] for poll in polls)
+    return {
+        "name": name,
+        "polls": len(polls),
+        "lag_peak": max((poll["lag"] or 0) for poll in polls),
+        "latency_avg_ms": 1000 * sum(latencies) / len(latencies),
+        "latency_max_ms": 1000 * latencies[-1],
+        "cpu_ms": 1000 * sum(poll["cpu"] for poll in polls),
+        "simulated_mysql_seconds": sum(poll["simulated_mysql_seconds"] for poll in polls),
+        "bytes_logged": sum(poll["bytes_logged"] for poll in polls),
+        "queries": sum(poll["queries"] for poll in polls),
+        "cli_calls": sum(poll["cli_calls"] for poll in polls),
+    }
+
+
+# ==================== Recorded Lag Curves ==================== #
+LOG_LAG_LINE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \| (?:.*?\| lag=(\d+)s|ERROR \| Seconds_Behind_Source is NULL)")
+
+
+def lag_curve_from_log(path, poll_interval=None):
+    """Rebuilds a per-poll lag curve from a monitor log; 'Seconds_Behind_Source is NULL' lines become None (null).
+    OK heartbeats are only written every OK_LOG_INTERVAL_SECONDS, so gaps between logged lines are filled by
+    repeating the previous value."""
+    poll_interval = poll_interval or monitor.POLL_INTERVAL_SECONDS
+    curve = []
+    last_time = None
+    with open(path) as f:
+        for line in f:
+            match = LOG_LAG_LINE.match(line)
+            if not match:
+                continue
+            logged_at = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")
+            if last_time is not None and curve:
+                missing = int((logged_at - last_time).total_seconds() // poll_interval) - 1
+                curve.extend([curve[-1]] * max(missing, 0))
+            curve.append(int(match.group(2)) if match.group(2) is not None else None)
+            last_time = logged_at
+    return curve
+
+
+# ==================== Output ==================== #
+def format_report(report, scenario_name):
+    header = (f"{'Segment':<12} | {'Polls':>5} | {'Peak lag':>8} | {'Avg poll ms':>11} | {'Max poll ms':>11} | "
+              f"{'CPU ms':>8} | {'MySQL s':>8} | {'Bytes logged':>12} | {'Queries':>7} | {'CLI calls':>9}")
+    separator = "-" * len(header)
+    rows = [
+        f"{s['name']:<12} | {s['polls']:>5} | {s['lag_peak']:>8} | {s['latency_avg_ms']:>11.3f} | {s['latency_max_ms']:>11.3f} | "
+        f"{s['cpu_ms']:>8.2f} | {s['simulated_mysql_seconds']:>8.2f} | {s['bytes_logged']:>12} | {s['queries']:>7} | {s['cli_calls']:>9}"
+        for s in report["segments"]
+    ]
+    title = f"REPLAY: {scenario_name} | {report['polls']} polls | {report['total_bytes_logged']} bytes logged"
+    return "\n".join([title, separator, header, separator] + rows)
+
+
+EXPECTABLE_KEYS = ("name", "polls", "lag_peak", "queries", "cli_calls", "bytes_logged", "simulated_mysql_seconds")
+
+
+def check_expectations(report, expect):
+    """Compares the deterministic parts of a report with the scenario's 'expect' block; returns mismatch lines."""
+    mismatches = []
+    for key in ("polls", "total_bytes_logged"):
+        if key in expect and expect[key] != report[key]:
+            mismatches.append(f"{key}: expected {expect[key]}, got {report[key]}")
+
+    if "segments" in expect:
+        if len(expect["segments"]) != len(report["segments"]):
+            mismatches.append(
+                f"segments: expected {[s.get('name') for s in expect['segments']]}, got {[s['name'] for s in report['segments']]}"
+            )
+        for index, (expected, segment) in enumerate(zip(expect["segments"], report["segments"])):
+            for key, value in expected.items():
+                if key not in EXPECTABLE_KEYS:
+                    mismatches.append(f"segment {index}: '{key}' is not a deterministic field - can't be expected")
+                elif (abs(segment[key] - value) > 1e-6) if isinstance(value, float) else segment[key] != value:
+                    mismatches.append(f"segment {index} ({segment['name']}) {key}: expected {value}, got {segment[key]}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded lag scenario through mysql_check_replication_lag.py")
+    parser.add_argument("scenario", help="scenario JSON file")
+    parser.add_argument("--lag-from-log", help="take the lag curve from an existing monitor log instead")
+    parser.add_argument("--repeat", type=int, default=1, help="run N times and keep the lowest CPU / latency per segment")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    if args.lag_from_log:
+        scenario["lag_curve"] = lag_curve_from_log(args.lag_from_log, scenario.get("settings", {}).get("POLL_INTERVAL_SECONDS"))
+    if not scenario.get("lag_curve"):
+        sys.exit("Scenario has an empty lag_curve - nothing to replay")
+
+    best = None
+    for _ in range(max(args.repeat, 1)):
+        report = Replay(scenario).run()
+        if best is None:
+            best = report
+            continue
+        # Decisions are deterministic, so only the timing columns differ between runs:
+        for kept, segment in zip(best["segments"], report["segments"]):
+            for key in ("latency_avg_ms", "latency_max_ms", "cpu_ms"):
+                kept[key] = min(kept[key], segment[key])
+
+    if args.json:
+        print(json.dumps(best, indent=2))
+    else:
+        print(format_report(best, os.path.basename(args.scenario)))
+
+    if "expect" in scenario:
+        mismatches = check_expectations(best, scenario["expect"])
+        for line in mismatches:
+            print(f"EXPECTATION FAILED: {line}", file=sys.stderr)
+        if mismatches:
+            sys.exit(1)
+        print("Expectations: OK", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()